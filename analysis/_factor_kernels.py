@@ -0,0 +1,140 @@
+"""
+技术因子计算的 numba 内核
+
+所有函数只接收/返回 numpy 数组，由 FactorAnalyzer.calculate_factors 调用。
+输出数组与输入同为 float32/float64，numba 会按输入类型分别编译；
+递推中的标量状态保留 float64，避免 float32 下误差逐日累积。
+"""
+import numpy as np
+
+from utils._njit import njit, prange
+
+
+@njit(cache=True, error_model='numpy')
+def rsi_kernel(close, n=14):
+    """
+    单次前向遍历计算 RSI
+
+    涨跌幅按 n 日简单平均（与 rolling(n).mean() 口径一致），第一天的涨跌幅记为 0。
+    窗口内的涨幅和、跌幅和逐日加入新值、减去移出窗口的值；同时记录窗口内上涨、
+    下跌的天数，窗口内无下跌时为 100，无涨跌时为 NaN，不受累加舍入误差影响。
+    """
+    size = close.shape[0]
+    out = np.full(size, np.nan, dtype=close.dtype)
+
+    gain = np.float64(0.0)
+    loss = np.float64(0.0)
+    up_days = 0
+    down_days = 0
+    for i in range(1, size):
+        # 加入第 i 天的涨跌幅
+        delta = np.float64(close[i]) - np.float64(close[i - 1])
+        if delta > 0:
+            gain += delta
+            up_days += 1
+        elif delta < 0:
+            loss -= delta
+            down_days += 1
+
+        # 移出第 i-n 天的涨跌幅（第0天记为0，无需移出）
+        j = i - n
+        if j >= 1:
+            delta = np.float64(close[j]) - np.float64(close[j - 1])
+            if delta > 0:
+                gain -= delta
+                up_days -= 1
+            elif delta < 0:
+                loss += delta
+                down_days -= 1
+
+        if i >= n - 1:
+            # 窗口内没有下跌时显式处理，不依赖除零行为，numba与纯Python回退结果一致
+            if down_days == 0:
+                out[i] = np.nan if up_days == 0 else 100.0
+            else:
+                out[i] = 100 - 100 / (1 + gain / loss)
+
+    return out
+
+
+@njit(cache=True)
+def macd_fused(close, fast=12, slow=26, signal=9):
+    """
+    一次遍历计算 MACD
+
+    三条指数移动平均均按 v = s*c + (1-s)*v 递推（等价于 pandas 的 ewm(adjust=False)），
+    信号线在同一次迭代中由当日的 MACD 值更新。
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (macd, signal, macd_hist)
+    """
+    n = close.shape[0]
+    macd = np.empty(n, dtype=close.dtype)
+    sig_line = np.empty(n, dtype=close.dtype)
+    hist = np.empty(n, dtype=close.dtype)
+    if n == 0:
+        return macd, sig_line, hist
+
+    s_fast = 2.0 / (fast + 1)
+    s_slow = 2.0 / (slow + 1)
+    s_sig = 2.0 / (signal + 1)
+    e_fast = close[0]
+    e_slow = close[0]
+    sig = 0.0
+    for i in range(n):
+        if i > 0:
+            e_fast = s_fast * close[i] + (1 - s_fast) * e_fast
+            e_slow = s_slow * close[i] + (1 - s_slow) * e_slow
+        macd[i] = e_fast - e_slow
+        if i == 0:
+            sig = macd[i]
+        else:
+            sig = s_sig * macd[i] + (1 - s_sig) * sig
+        sig_line[i] = sig
+        hist[i] = macd[i] - sig
+    return macd, sig_line, hist
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def ic_ls_grid(factor, returns, factor_rank, return_rank):
+    """
+    并行计算各(因子, 周期)组合的IC与多空组合收益
+
+    Parameters:
+    -----------
+    factor, returns : numpy.ndarray
+        形状为 (n, k)，第j列为第j个组合的因子值与未来收益，
+        两者已按共同有效样本屏蔽，NaN位置一致
+    factor_rank, return_rank : numpy.ndarray
+        factor、returns 逐列的平均秩
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (ic, long_short)，长度均为 k；IC为秩的Pearson相关系数，
+        多空收益为高于80%分位数组与不高于20%分位数组的平均收益之差
+    """
+    k = factor.shape[1]
+    ic = np.full(k, np.nan)
+    long_short = np.full(k, np.nan)
+
+    for j in prange(k):
+        valid = ~np.isnan(factor[:, j])
+        if not valid.any():
+            continue
+
+        fr = factor_rank[:, j][valid]
+        rr = return_rank[:, j][valid]
+        fr = fr - fr.mean()
+        rr = rr - rr.mean()
+        ic[j] = (fr * rr).sum() / np.sqrt((fr * fr).sum() * (rr * rr).sum())
+
+        fv = factor[:, j][valid]
+        rv = returns[:, j][valid]
+        q20 = np.quantile(fv, 0.2)
+        q80 = np.quantile(fv, 0.8)
+        long_short[j] = rv[fv > q80].mean() - rv[fv <= q20].mean()
+
+    return ic, long_short
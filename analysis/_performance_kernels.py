@@ -0,0 +1,55 @@
+"""
+绩效分析的 numba 内核
+
+由 PerformanceAnalyzer 调用，输入输出均为 numpy 数组。
+"""
+import numpy as np
+
+from utils._njit import njit
+
+
+@njit(cache=True)
+def summary_streams(values, window=20):
+    """
+    一次遍历计算组合价值序列的各项衍生序列
+
+    Parameters:
+    -----------
+    values : numpy.ndarray
+        组合价值序列
+    window : int
+        滚动平均收益率的窗口长度
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (daily_returns, cumulative_returns, rolling_max, drawdowns, rolling_returns)
+        日收益率（小数，首日为0）、累积收益率（首日为1）、累积收益率的历史最高值、
+        回撤（百分比）、日收益率的 window 日滚动均值（窗口未满为 NaN）
+    """
+    n = values.shape[0]
+    daily_returns = np.empty(n)
+    cumulative_returns = np.empty(n)
+    rolling_max = np.empty(n)
+    drawdowns = np.empty(n)
+    rolling_returns = np.full(n, np.nan)
+
+    window_sum = 0.0
+    for i in range(n):
+        if i == 0:
+            daily_returns[i] = 0.0
+            cumulative_returns[i] = 1.0
+            rolling_max[i] = 1.0
+        else:
+            daily_returns[i] = values[i] / values[i - 1] - 1
+            cumulative_returns[i] = cumulative_returns[i - 1] * (1 + daily_returns[i])
+            rolling_max[i] = max(rolling_max[i - 1], cumulative_returns[i])
+        drawdowns[i] = (cumulative_returns[i] - rolling_max[i]) / rolling_max[i] * 100
+
+        window_sum += daily_returns[i]
+        if i >= window:
+            window_sum -= daily_returns[i - window]
+        if i >= window - 1:
+            rolling_returns[i] = window_sum / window
+
+    return daily_returns, cumulative_returns, rolling_max, drawdowns, rolling_returns
@@ -1,10 +1,77 @@
+import hashlib
+import os
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import akshare as ak
 from scipy import stats
 import matplotlib.pyplot as plt
 from tqdm import tqdm
 
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+from analysis._factor_kernels import rsi_kernel, macd_fused, ic_ls_grid
+
+# akshare行情数据的本地缓存目录，设置环境变量 QUANT_FORCE_REFETCH=1 可强制重新下载
+CACHE_DIR = Path('~/.cache/quant').expanduser()
+
+# 价格类指标只需float32精度，成交量保持int64
+FLOAT32_COLUMNS = ['open', 'close', 'high', 'low', 'amount', 'pct_change', 'change', 'turnover']
+
+
+def _rolling(values, window, reducer, **kwargs):
+    """
+    滚动窗口统计，前 window-1 个位置补 NaN，使结果与原序列按日期对齐
+
+    reducer 为 np.mean/np.std 等沿 axis=1 归约的函数；序列长度不足一个窗口时
+    返回全 NaN（与 rolling(window) 一致）
+    """
+    if len(values) < window:
+        return np.full(len(values), np.nan, dtype=values.dtype)
+    result = reducer(sliding_window_view(values, window), axis=1, **kwargs)
+    return np.concatenate([np.full(window - 1, np.nan, dtype=result.dtype), result])
+
+
+def _to_float32(df):
+    """将存在的价格类列转换为float32，减少后续因子计算的内存带宽"""
+    columns = [col for col in FLOAT32_COLUMNS if col in df.columns]
+    df[columns] = df[columns].astype(np.float32)
+    return df
+
+
+def _quintile_codes(values):
+    """
+    按五分位给每个样本分组，返回0~4的组号
+
+    分位点用np.quantile选取（线性插值，与pd.qcut的分界一致，只需部分排序），
+    各组为左开右闭区间，最小值归入第0组。
+    """
+    edges = np.quantile(values, [0.2, 0.4, 0.6, 0.8])
+    return np.searchsorted(edges, values, side='left')
+
+
+def _nanrank(values):
+    """逐列计算平均秩（并列取平均），NaN位置保持为NaN；优先使用bottleneck的C实现"""
+    if bn is not None:
+        return bn.nanrankdata(values, axis=0)
+    return stats.rankdata(values, axis=0, nan_policy='omit')
+
+
+def _pct_change(values, periods):
+    """相对 periods 天前的变化率；periods 为负数时为相对 -periods 天后的变化率"""
+    out = np.full(values.shape[0], np.nan, dtype=values.dtype)
+    if periods > 0:
+        out[periods:] = values[periods:] / values[:-periods] - 1
+    else:
+        out[:periods] = values[-periods:] / values[:periods] - 1
+    return out
+
+
 class FactorAnalyzer:
     def __init__(self, stock_code, start_date='20200101', end_date='20241231'):
         self.stock_code = stock_code
@@ -14,7 +81,14 @@ class FactorAnalyzer:
         self.load_data()
         
     def load_data(self):
-        """加载股票数据"""
+        """加载股票数据，优先读取本地parquet缓存"""
+        key = hashlib.md5(f"{self.stock_code}{self.start_date}{self.end_date}".encode()).hexdigest()
+        cache_path = CACHE_DIR / f"{key}.parquet"
+        if cache_path.exists() and os.getenv('QUANT_FORCE_REFETCH') != '1':
+            self.data = _to_float32(pd.read_parquet(cache_path))
+            print(f"从缓存加载{len(self.data)}条数据: {cache_path}")
+            return
+        
         try:
             # 使用akshare获取股票数据
             df = ak.stock_zh_a_hist(symbol=self.stock_code, period="daily",
@@ -49,6 +123,7 @@ class FactorAnalyzer:
                     rename_dict[cn] = en
             
             df.rename(columns=rename_dict, inplace=True)
+            _to_float32(df)
             
             df['date'] = pd.to_datetime(df['date'])
             df.set_index('date', inplace=True)
@@ -62,56 +137,71 @@ class FactorAnalyzer:
         except Exception as e:
             print(f"加载数据时出错: {e}")
             raise
+        
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.data.to_parquet(cache_path, engine='pyarrow', compression='zstd')
+        except Exception as e:
+            print(f"写入数据缓存时出错: {e}")
             
     def calculate_factors(self):
         """计算各种技术因子"""
-        df = self.data.copy()
+        close, high, low, volume = np.ascontiguousarray(
+            self.data[['close', 'high', 'low', 'volume']].to_numpy(dtype=np.float32).T)
+        factors = {}
         
         # 1. 动量因子
-        df['momentum_5'] = df['close'].pct_change(5)
-        df['momentum_10'] = df['close'].pct_change(10)
-        df['momentum_20'] = df['close'].pct_change(20)
+        factors['momentum_5'] = _pct_change(close, 5)
+        factors['momentum_10'] = _pct_change(close, 10)
+        factors['momentum_20'] = _pct_change(close, 20)
         
         # 2. 波动率因子
-        df['volatility_5'] = df['close'].rolling(5).std()
-        df['volatility_10'] = df['close'].rolling(10).std()
-        df['volatility_20'] = df['close'].rolling(20).std()
+        factors['volatility_5'] = _rolling(close, 5, np.std, ddof=1)
+        factors['volatility_10'] = _rolling(close, 10, np.std, ddof=1)
+        factors['volatility_20'] = _rolling(close, 20, np.std, ddof=1)
         
         # 3. 成交量因子
-        df['volume_ma5'] = df['volume'].rolling(5).mean()
-        df['volume_ma10'] = df['volume'].rolling(10).mean()
-        df['volume_ratio'] = df['volume'] / df['volume'].rolling(5).mean()
+        factors['volume_ma5'] = _rolling(volume, 5, np.mean)
+        factors['volume_ma10'] = _rolling(volume, 10, np.mean)
+        factors['volume_ratio'] = volume / factors['volume_ma5']
         
         # 4. 价格技术指标
         # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
+        factors['rsi'] = rsi_kernel(close, 14)
         
         # MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = exp1 - exp2
-        df['signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        df['macd_hist'] = df['macd'] - df['signal']
+        factors['macd'], factors['signal'], factors['macd_hist'] = macd_fused(close, 12, 26, 9)
         
         # 5. 价格位置指标
-        df['price_position'] = (df['close'] - df['low'].rolling(20).min()) / \
-                             (df['high'].rolling(20).max() - df['low'].rolling(20).min())
+        low_20 = _rolling(low, 20, np.min)
+        high_20 = _rolling(high, 20, np.max)
+        factors['price_position'] = (close - low_20) / (high_20 - low_20)
         
         # 计算未来收益率（作为标签）
-        df['future_return_1d'] = df['close'].shift(-1) / df['close'] - 1
-        df['future_return_5d'] = df['close'].shift(-5) / df['close'] - 1
-        df['future_return_10d'] = df['close'].shift(-10) / df['close'] - 1
+        factors['future_return_1d'] = _pct_change(close, -1)
+        factors['future_return_5d'] = _pct_change(close, -5)
+        factors['future_return_10d'] = _pct_change(close, -10)
         
-        self.factor_data = df
-        return df
+        # 只为新增的因子列构建一次DataFrame，不复制原始数据
+        self.factor_data = self.data.join(pd.DataFrame(factors, index=self.data.index))
+        return self.factor_data
     
-    def analyze_factors(self):
-        """分析因子与未来收益的相关性"""
-        df = self.factor_data.copy()
+    def analyze_factors(self, complete_case=False):
+        """
+        分析因子与未来收益的相关性
+        
+        Parameters:
+        -----------
+        complete_case : bool, optional
+            默认按每个(因子, 周期)组合各自的有效样本计算；为True时只使用所有因子
+            和收益率均有效的交易日，各组合样本相同，每列只需排序一次，速度更快
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            每个(因子, 周期)组合一行，period列为整数预测天数（1、5、10）
+        """
+        df = self.factor_data
         
         # 定义要分析的因子列表
         factors = ['momentum_5', 'momentum_10', 'momentum_20',
@@ -119,36 +209,49 @@ class FactorAnalyzer:
                   'volume_ma5', 'volume_ma10', 'volume_ratio',
                   'rsi', 'macd', 'macd_hist', 'price_position']
         
-        # 定义预测周期
-        predict_periods = ['future_return_1d', 'future_return_5d', 'future_return_10d']
-        
-        results = []
-        for factor in factors:
-            for period in predict_periods:
-                # 确保因子和收益率数据对齐
-                factor_data = pd.DataFrame({
-                    'factor': df[factor],
-                    'return': df[period]
-                }).dropna()
-                
-                if len(factor_data) > 0:
-                    # 计算IC值
-                    ic = stats.spearmanr(factor_data['factor'], factor_data['return'])[0]
-                    
-                    # 计算分组收益差异
-                    factor_data['group'] = pd.qcut(factor_data['factor'], q=5, labels=['G1', 'G2', 'G3', 'G4', 'G5'])
-                    group_returns = factor_data.groupby('group', observed=True)['return'].mean()
-                    long_short_return = group_returns['G5'] - group_returns['G1']
-                    
-                    results.append({
-                        'factor': factor,
-                        'period': period,
-                        'ic': ic,
-                        'long_short_return': long_short_return,
-                        'sample_size': len(factor_data)
-                    })
-                
-        return pd.DataFrame(results)
+        # 定义预测周期（天数），结果中的period列直接用整数表示
+        horizons = [1, 5, 10]
+        predict_periods = [f'future_return_{h}d' for h in horizons]
+        
+        # 展开成(因子, 周期)成对的矩阵：第k列是第k个组合在共同有效样本上的取值，
+        # 列顺序与逐个因子、逐个周期遍历的顺序一致
+        factor_values = df[factors].to_numpy(dtype=np.float64)
+        period_returns = df[predict_periods].to_numpy(dtype=np.float64)
+        
+        if complete_case:
+            # 所有列的有效样本相同，成对矩阵的秩直接由各列的秩展开得到
+            valid_rows = ~(np.isnan(factor_values).any(axis=1) | np.isnan(period_returns).any(axis=1))
+            factor_values = factor_values[valid_rows]
+            period_returns = period_returns[valid_rows]
+            pair_factor = np.repeat(factor_values, len(predict_periods), axis=1)
+            pair_return = np.tile(period_returns, (1, len(factors)))
+            pair_factor_rank = np.repeat(_nanrank(factor_values), len(predict_periods), axis=1)
+            pair_return_rank = np.tile(_nanrank(period_returns), (1, len(factors)))
+            sample_size = np.full(pair_factor.shape[1], valid_rows.sum())
+        else:
+            pair_factor = np.repeat(factor_values, len(predict_periods), axis=1)
+            pair_return = np.tile(period_returns, (1, len(factors)))
+            
+            # 确保因子和收益率数据对齐
+            invalid = np.isnan(pair_factor) | np.isnan(pair_return)
+            pair_factor[invalid] = np.nan
+            pair_return[invalid] = np.nan
+            pair_factor_rank = _nanrank(pair_factor)
+            pair_return_rank = _nanrank(pair_return)
+            sample_size = (~invalid).sum(axis=0)
+        
+        # 计算IC值（Spearman相关系数即秩的Pearson相关系数）与分组收益差异：
+        # 与五分位分组口径一致，G1为不高于20%分位数，G5为高于80%分位数
+        ic, long_short_return = ic_ls_grid(pair_factor, pair_return, pair_factor_rank, pair_return_rank)
+        
+        results = pd.DataFrame({
+            'factor': np.repeat(factors, len(predict_periods)),
+            'period': np.tile(horizons, len(factors)),
+            'ic': ic,
+            'long_short_return': long_short_return,
+            'sample_size': sample_size
+        })
+        return results[results['sample_size'] > 0].reset_index(drop=True)
     
     def get_strategy_suggestion(self):
         """根据因子分析结果给出策略建议"""
@@ -168,9 +271,9 @@ class FactorAnalyzer:
         # 基于IC的建议
         ic_direction = "正" if best_ic_factor['ic'] > 0 else "负"
         period_map = {
-            'future_return_1d': '1天',
-            'future_return_5d': '5天',
-            'future_return_10d': '10天'
+            1: '1天',
+            5: '5天',
+            10: '10天'
         }
         factor_map = {
             'volume_ma5': '5日成交量均线',
@@ -239,7 +342,7 @@ class FactorAnalyzer:
     
     def plot_factor_analysis(self, factor_name):
         """绘制因子分析图"""
-        df = self.factor_data.copy()
+        df = self.factor_data
         
         # 创建子图
         fig, axes = plt.subplots(2, 2, figsize=(15, 10))
@@ -265,18 +368,18 @@ class FactorAnalyzer:
         axes[1, 0].set_ylabel('5日收益率')
         
         # 4. 分组收益分析
-        factor_data = pd.DataFrame({
-            'factor': df[factor_name],
-            'return': df['future_return_5d']
-        }).dropna()
-        factor_data['group'] = pd.qcut(factor_data['factor'], q=5, labels=['G1', 'G2', 'G3', 'G4', 'G5'])
-        group_returns = factor_data.groupby('group', observed=True)['return'].mean()
+        factor_values = df[factor_name].to_numpy(dtype=np.float64)
+        period_returns = df['future_return_5d'].to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(factor_values) | np.isnan(period_returns))
+        codes = _quintile_codes(factor_values[valid])
+        group_returns = (np.bincount(codes, weights=period_returns[valid], minlength=5) /
+                         np.bincount(codes, minlength=5))
         axes[1, 1].bar(range(5), group_returns)
         axes[1, 1].set_title(f'{factor_name}因子分组收益分析')
         axes[1, 1].set_xlabel('分组')
         axes[1, 1].set_ylabel('平均收益率')
         axes[1, 1].set_xticks(range(5))
-        axes[1, 1].set_xticklabels(group_returns.index)
+        axes[1, 1].set_xticklabels(['G1', 'G2', 'G3', 'G4', 'G5'])
         
         plt.tight_layout()
         plt.show()
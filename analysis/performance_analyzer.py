@@ -3,11 +3,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import matplotlib.dates as mdates
-from scipy.stats import gaussian_kde
-import akshare as ak
+from scipy.ndimage import gaussian_filter1d
 import webbrowser
 import os
 
+from analysis._performance_kernels import summary_streams
+from utils.stock_info import get_stock_name
+
 class PerformanceAnalyzer:
     def __init__(self, portfolio_values, stock_code=None):
         """
@@ -26,39 +28,25 @@ class PerformanceAnalyzer:
         
         # 获取股票中文名称
         if stock_code:
-            try:
-                # 使用tushare的基础数据接口
-                import tushare as ts
-                ts.set_token('your_token_here')  # 需要先在tushare网站注册获取token
-                pro = ts.pro_api()
-                
-                # 获取股票基本信息
-                df = pro.stock_basic(exchange='', list_status='L')
-                stock_info = df[df['symbol'] == stock_code]
-                if not stock_info.empty:
-                    self.stock_chinese_name = stock_info.iloc[0]['name']
-                    print(f"获取到股票信息: {stock_code} - {self.stock_chinese_name}")
-            except Exception as e:
-                print(f"获取股票信息时出错: {e}")
-                
-                # 如果tushare获取失败，尝试使用akshare
-                try:
-                    stock_info = ak.stock_individual_info_em(symbol=stock_code)
-                    if not stock_info.empty:
-                        # 尝试获取股票名称
-                        name_row = stock_info[stock_info['item'].str.contains('名称|简称', na=False)]
-                        if not name_row.empty:
-                            self.stock_chinese_name = name_row.iloc[0]['value']
-                            print(f"使用akshare获取到股票信息: {stock_code} - {self.stock_chinese_name}")
-                except Exception as e2:
-                    print(f"使用akshare获取股票信息时也出错: {e2}")
+            self.stock_chinese_name = get_stock_name(stock_code)
+            if self.stock_chinese_name:
+                print(f"获取到股票信息: {stock_code} - {self.stock_chinese_name}")
         
         self.initial_value = portfolio_values.iloc[0]
         
-    def calculate_metrics(self):
-        """计算性能指标"""
-        # 计算每日收益率
-        daily_returns = self.portfolio_values.pct_change().fillna(0)
+    def calculate_metrics(self, streams=None):
+        """
+        计算性能指标
+        
+        Parameters:
+        -----------
+        streams : tuple, optional
+            已计算好的 summary_streams 结果，传入时不再重复遍历组合价值序列
+        """
+        # 一次遍历得到日收益率与回撤序列
+        if streams is None:
+            streams = summary_streams(self.portfolio_values.to_numpy(dtype=np.float64))
+        daily_returns, _, _, drawdowns, _ = streams
         
         # 计算累积收益率
         total_return = (self.portfolio_values.iloc[-1] / self.portfolio_values.iloc[0] - 1) * 100
@@ -68,20 +56,17 @@ class PerformanceAnalyzer:
         annual_return = ((1 + total_return/100) ** (252/days) - 1) * 100
         
         # 计算波动率
-        volatility = daily_returns.std() * np.sqrt(252) * 100
+        volatility = daily_returns.std(ddof=1) * np.sqrt(252) * 100
         
         # 计算夏普比率 (假设无风险收益率为3%)
         risk_free_rate = 0.03
         sharpe_ratio = (annual_return/100 - risk_free_rate) / (volatility/100) if volatility != 0 else 0
         
         # 计算最大回撤
-        cumulative_returns = (1 + daily_returns).cumprod()
-        rolling_max = cumulative_returns.expanding().max()
-        drawdowns = (cumulative_returns - rolling_max) / rolling_max * 100
         max_drawdown = abs(drawdowns.min())
         
         # 计算日胜率
-        win_rate = len(daily_returns[daily_returns > 0]) / len(daily_returns[daily_returns != 0])
+        win_rate = np.count_nonzero(daily_returns > 0) / np.count_nonzero(daily_returns)
         
         return {
             '累积收益率': total_return,
@@ -116,18 +101,18 @@ class PerformanceAnalyzer:
                              left=0.12,     # 增加左边距
                              right=0.95)    # 保持右边距
         
-        # 计算指标
-        daily_returns = self.portfolio_values.pct_change().fillna(0) * 100
-        cumulative_returns = (1 + daily_returns/100).cumprod()
-        rolling_max = cumulative_returns.expanding().max()
-        drawdowns = (cumulative_returns - rolling_max) / rolling_max * 100
+        # 计算指标：一次遍历得到各子图所需的全部序列
+        dates = self.portfolio_values.index
+        streams = summary_streams(self.portfolio_values.to_numpy(dtype=np.float64), 20)
+        daily_returns, cumulative_returns, _, drawdowns, rolling_returns = streams
+        daily_returns = daily_returns * 100  # 日收益率（百分比）
         
         # 1. 累积收益率曲线
         ax1 = plt.subplot(gs[0, :])
-        ax1.plot(cumulative_returns.index, cumulative_returns.values, 
+        ax1.plot(dates, cumulative_returns, 
                 label='累积收益率', color='#1f77b4', linewidth=2)
-        ax1.fill_between(drawdowns.index, 0, drawdowns.values, 
-                        color='#ff9999', alpha=0.3, label='回撤')
+        ax1.fill_between(dates, 0, drawdowns, 
+                        color='#ff9999', alpha=0.3, label='回撤', rasterized=True)
         
         # 设置x轴日期格式
         ax1.xaxis.set_major_locator(mdates.YearLocator())
@@ -147,13 +132,17 @@ class PerformanceAnalyzer:
         
         # 2. 日收益率分布直方图
         ax2 = plt.subplot(gs[1, 0])
-        n, bins, patches = ax2.hist(daily_returns, bins=50, density=True, 
-                                  alpha=0.75, color='#2ecc71')
+        # 只做一次细分箱统计：直方图由每4个细分箱合并而来，密度曲线由细分箱高斯平滑得到
+        counts, edges = np.histogram(daily_returns, bins=200, density=True)
+        bar_counts = counts.reshape(50, 4).mean(axis=1)
+        bar_width = edges[4] - edges[0]
+        ax2.bar(edges[:-1:4] + bar_width / 2, bar_counts, width=bar_width,
+                alpha=0.75, color='#2ecc71')
         
         # 添加核密度估计
-        kde = gaussian_kde(daily_returns)
-        x_range = np.linspace(daily_returns.min(), daily_returns.max(), 100)
-        ax2.plot(x_range, kde(x_range), 'r-', linewidth=2, label='密度估计')
+        centers = (edges[:-1] + edges[1:]) / 2
+        density = gaussian_filter1d(counts, sigma=3)
+        ax2.plot(centers, density, 'r-', linewidth=2, label='密度估计')
         
         # 设置标题和标签
         ax2.set_title('日收益率分布', pad=20, fontsize=12)
@@ -168,9 +157,9 @@ class PerformanceAnalyzer:
         
         # 3. 回撤分析
         ax3 = plt.subplot(gs[1, 1])
-        ax3.fill_between(drawdowns.index, drawdowns.values, 0, 
-                        color='#e74c3c', alpha=0.5)
-        ax3.plot(drawdowns.index, drawdowns.values, 
+        ax3.fill_between(dates, drawdowns, 0, 
+                        color='#e74c3c', alpha=0.5, rasterized=True)
+        ax3.plot(dates, drawdowns, 
                 color='#c0392b', linewidth=1, label='回撤')
         
         # 设置x轴日期格式
@@ -186,8 +175,8 @@ class PerformanceAnalyzer:
         
         # 4. 滚动收益率
         ax4 = plt.subplot(gs[2, 0])
-        rolling_returns = daily_returns.rolling(window=20).mean() * 20  # 月化收益率
-        ax4.plot(rolling_returns.index, rolling_returns.values, 
+        rolling_returns = rolling_returns * 100 * 20  # 月化收益率
+        ax4.plot(dates, rolling_returns, 
                 color='#8e44ad', linewidth=1.5, label='20日滚动收益率')
         ax4.axhline(y=0, color='black', linestyle='--', alpha=0.3)
         
@@ -205,7 +194,7 @@ class PerformanceAnalyzer:
         
         # 5. 性能指标表格
         ax5 = plt.subplot(gs[2, 1])
-        metrics = self.calculate_metrics()
+        metrics = self.calculate_metrics(streams)
         metrics_formatted = {
             '累积收益率': f"{metrics['累积收益率']:.2f}%",
             '年化收益率': f"{metrics['年化收益率']:.2f}%",
@@ -245,7 +234,7 @@ class PerformanceAnalyzer:
         
         # 保存图表
         if filename:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
+            plt.savefig(filename, dpi=150, bbox_inches='tight', pil_kwargs={'optimize': True})
             
         # 显示图表
         plt.show()
@@ -1,9 +1,13 @@
 import backtrader as bt
 import datetime
-import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.dates as mdates
 from matplotlib import font_manager
+from matplotlib.collections import LineCollection
 import webbrowser
+import threading
 import os
 import numpy as np
 
@@ -16,10 +20,14 @@ except:
 
 class BacktestEngine:
     def __init__(self, initial_cash=100000.0):
-        self.cerebro = bt.Cerebro()
+        # 报告由plot自行绘制，不需要默认的Trades/BuySell观察器逐bar记录数据，
+        # 只保留AnnualReturn分析器依赖的Broker观察器；
+        # 策略依赖预加载的完整数据，不能使用exactbars（会关闭preload与runonce）
+        self.cerebro = bt.Cerebro(stdstats=False)
+        self.cerebro.addobserver(bt.observers.Broker)
         self.cerebro.broker.setcash(initial_cash)
         self.initial_cash = initial_cash
-        self.portfolio_values = []  # 用于存储每日的组合价值
+        self.portfolio_values = np.empty(0)  # 用于存储每日的组合价值
         self.stock_name = None  # 用于存储股票名称
         
     def add_data(self, data, name=None):
@@ -45,13 +53,18 @@ class BacktestEngine:
         # 记录每日的投资组合价值
         class ValueAnalyzer(bt.Analyzer):
             def __init__(self):
-                self.values = []
+                # 数据预加载时buflen即为总bar数，否则在next中按需扩容
+                self.values = np.empty(max(self.strategy.data.buflen(), 1), dtype=np.float64)
+                self._i = 0
                 
             def next(self):
-                self.values.append(self.strategy.broker.getvalue())
+                if self._i == len(self.values):
+                    self.values = np.resize(self.values, 2 * len(self.values))
+                self.values[self._i] = self.strategy.broker.getvalue()
+                self._i += 1
                 
             def get_analysis(self):
-                return self.values
+                return self.values[:self._i]
         
         self.cerebro.addanalyzer(ValueAnalyzer, _name='value')
         
@@ -98,10 +111,27 @@ class BacktestEngine:
             '胜率': win_rate * 100
         }
         
-    def plot(self, filename=None):
-        """绘制完整的回测报告"""
+    def plot(self, filename=None, open_browser=False):
+        """
+        绘制完整的回测报告
+        
+        Parameters:
+        -----------
+        filename : str, optional
+            图片保存路径
+        open_browser : bool, optional
+            保存后是否在默认浏览器中打开图片（后台线程打开，不阻塞回测）
+            
+        Returns:
+        --------
+        str or None
+            图片的绝对路径，未指定filename时返回None
+        """
         # 创建图表
-        fig = plt.figure(figsize=(15, 20))
+        # 报告只保存为图片，直接在独立的Agg画布上绘制，不依赖pyplot的全局状态和GUI后端
+        fig = Figure(figsize=(15, 20))
+        FigureCanvasAgg(fig)
+        gs = fig.add_gridspec(4, 1)
         
         # 设置总标题
         title = 'MACD策略回测报告'
@@ -110,31 +140,29 @@ class BacktestEngine:
         fig.suptitle(title, fontsize=16, y=0.95)
         
         # 1. 收益率曲线
-        ax1 = plt.subplot2grid((4, 1), (0, 0))
-        portfolio_series = pd.Series(self.portfolio_values, index=self.data.index[-len(self.portfolio_values):])
-        returns = portfolio_series.pct_change()
-        cumulative_returns = (1 + returns).cumprod()
-        ax1.plot(cumulative_returns.index, cumulative_returns.values, label='策略收益率', color='blue')
-        ax1.fill_between(cumulative_returns.index, cumulative_returns.values, 1, alpha=0.3, color='blue')
+        ax1 = fig.add_subplot(gs[0])
+        values = np.asarray(self.portfolio_values, dtype=np.float64)
+        dates = self.data.index[-len(values):]
+        cumulative_returns = values / values[0]
+        ax1.plot(dates, cumulative_returns, label='策略收益率', color='blue')
+        ax1.fill_between(dates, cumulative_returns, 1, alpha=0.3, color='blue', rasterized=True)
         ax1.grid(True)
         ax1.set_title('累积收益率曲线')
         ax1.legend()
         
         # 2. K线图和交易点
-        ax2 = plt.subplot2grid((4, 1), (1, 0))
-        
-        # 绘制K线
-        for i in range(len(self.data)):
-            if self.data['Open'].iloc[i] < self.data['Close'].iloc[i]:
-                color = 'red'
-            else:
-                color = 'green'
-            ax2.plot([self.data.index[i], self.data.index[i]], 
-                    [self.data['Low'].iloc[i], self.data['High'].iloc[i]], 
-                    color=color, linewidth=1)
-            ax2.plot([self.data.index[i], self.data.index[i]], 
-                    [self.data['Open'].iloc[i], self.data['Close'].iloc[i]], 
-                    color=color, linewidth=3)
+        ax2 = fig.add_subplot(gs[1])
+        
+        # 绘制K线：影线和实体各用一个LineCollection批量绘制
+        x = mdates.date2num(self.data.index)
+        opens, closes, highs, lows = (self.data[col].to_numpy() for col in ('Open', 'Close', 'High', 'Low'))
+        colors = np.where(opens < closes, 'red', 'green')
+        wicks = np.stack([np.column_stack([x, lows]), np.column_stack([x, highs])], axis=1)
+        bodies = np.stack([np.column_stack([x, opens]), np.column_stack([x, closes])], axis=1)
+        ax2.xaxis_date()
+        ax2.add_collection(LineCollection(wicks, colors=colors, linewidths=1, rasterized=True))
+        ax2.add_collection(LineCollection(bodies, colors=colors, linewidths=3, rasterized=True))
+        ax2.autoscale_view()
         
         # 标注买卖点
         trades = self.results.analyzers.trades.get_analysis()
@@ -152,16 +180,16 @@ class BacktestEngine:
         ax2.grid(True)
         
         # 3. 回撤曲线
-        ax3 = plt.subplot2grid((4, 1), (2, 0))
-        drawdown = (portfolio_series / portfolio_series.expanding().max() - 1) * 100
-        ax3.fill_between(drawdown.index, drawdown.values, 0, color='red', alpha=0.3)
-        ax3.plot(drawdown.index, drawdown.values, color='red', label='回撤百分比')
+        ax3 = fig.add_subplot(gs[2])
+        drawdown = (values / np.maximum.accumulate(values) - 1) * 100
+        ax3.fill_between(dates, drawdown, 0, color='red', alpha=0.3, rasterized=True)
+        ax3.plot(dates, drawdown, color='red', label='回撤百分比')
         ax3.set_title('回撤曲线')
         ax3.grid(True)
         ax3.legend()
         
         # 4. 性能指标
-        ax4 = plt.subplot2grid((4, 1), (3, 0))
+        ax4 = fig.add_subplot(gs[3])
         stats = self.get_performance_stats()
         
         # 创建性能指标表格
@@ -191,11 +219,14 @@ class BacktestEngine:
         ax4.axis('off')
         ax4.set_title('策略性能指标')
         
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
         
-        if filename:
-            plt.savefig(filename, dpi=150, bbox_inches='tight')
+        if not filename:
+            return None
+            
+        fig.savefig(filename, dpi=150, bbox_inches='tight', pil_kwargs={'optimize': True})
+        abs_path = os.path.abspath(filename)
+        if open_browser:
             # 在默认浏览器中打开图片
-            abs_path = os.path.abspath(filename)
-            webbrowser.open('file://' + abs_path)
-        plt.close()
+            threading.Thread(target=webbrowser.open, args=('file://' + abs_path,), daemon=True).start()
+        return abs_path
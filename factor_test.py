@@ -6,53 +6,58 @@ import pandas as pd
 
 from analysis.factor_analysis import FactorAnalyzer
 
+# 预测周期与因子名称的中文显示
+PERIOD_NAMES = {
+    1: '1天',
+    5: '5天',
+    10: '10天'
+}
+
+FACTOR_NAMES = {
+    'volume_ma5': '5日成交量均线',
+    'volume_ma10': '10日成交量均线',
+    'volume_ratio': '成交量比率',
+    'momentum_5': '5日动量',
+    'momentum_10': '10日动量',
+    'momentum_20': '20日动量',
+    'volatility_5': '5日波动率',
+    'volatility_10': '10日波动率',
+    'volatility_20': '20日波动率',
+    'rsi': 'RSI指标',
+    'macd': 'MACD',
+    'macd_hist': 'MACD柱',
+    'price_position': '价格位置'
+}
+
 def format_period(period):
     """将预测周期转换为更易读的格式"""
-    if period == 'future_return_1d':
-        return '1天'
-    elif period == 'future_return_5d':
-        return '5天'
-    elif period == 'future_return_10d':
-        return '10天'
-    return period
+    return PERIOD_NAMES.get(period, period)
 
 def format_factor(factor):
     """将因子名称转换为更易读的格式"""
-    factor_names = {
-        'volume_ma5': '5日成交量均线',
-        'volume_ma10': '10日成交量均线',
-        'volume_ratio': '成交量比率',
-        'momentum_5': '5日动量',
-        'momentum_10': '10日动量',
-        'momentum_20': '20日动量',
-        'volatility_5': '5日波动率',
-        'volatility_10': '10日波动率',
-        'volatility_20': '20日波动率',
-        'rsi': 'RSI指标',
-        'macd': 'MACD',
-        'macd_hist': 'MACD柱',
-        'price_position': '价格位置'
-    }
-    return factor_names.get(factor, factor)
+    return FACTOR_NAMES.get(factor, factor)
 
 def print_factor_analysis(results):
     """打印因子分析结果"""
     print("\n=== 因子分析摘要 ===")
     
     # 按预测周期分组显示最有效的因子
-    periods = ['future_return_1d', 'future_return_5d', 'future_return_10d']
+    periods = [1, 5, 10]
+    
+    # |IC|只计算一次，按|IC|排序后每个周期取前3个因子
+    top_factors = (results.assign(abs_ic=results['ic'].abs())
+                   .sort_values('abs_ic', ascending=False, kind='stable')
+                   .groupby('period', sort=False).head(3))
     
     for period in periods:
-        period_results = results[results['period'] == period].copy()
-        period_results['abs_ic'] = period_results['ic'].abs()
-        top_factors = period_results.nlargest(3, 'abs_ic')
+        period_top = top_factors[top_factors['period'] == period]
         
         print(f"\n{format_period(period)}预测效果最好的因子：")
-        for _, row in top_factors.iterrows():
-            direction = "正" if row['ic'] > 0 else "负"
-            print(f"- {format_factor(row['factor'])}:")
-            print(f"  • 与收益{direction}相关，IC值为{row['ic']:.3f}")
-            print(f"  • 多空组合收益率为{row['long_short_return']*100:.2f}%")
+        for row in period_top.itertuples(index=False):
+            direction = "正" if row.ic > 0 else "负"
+            print(f"- {format_factor(row.factor)}:")
+            print(f"  • 与收益{direction}相关，IC值为{row.ic:.3f}")
+            print(f"  • 多空组合收益率为{row.long_short_return*100:.2f}%")
 
 def print_strategy_suggestions(suggestions):
     """打印策略建议"""
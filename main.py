@@ -2,31 +2,35 @@ from utils.data_loader import DataLoader
 from backtest.backtest_engine import BacktestEngine
 from strategies.macd_histogram_strategy import MACDHistogramStrategy
 from analysis.performance_analyzer import PerformanceAnalyzer
+from utils import stock_info
 import os
+import sys
 import pandas as pd
 import numpy as np
-import akshare as ak
 import matplotlib
 matplotlib.use('TkAgg')  # 设置matplotlib后端
 import matplotlib.pyplot as plt
 
 def get_stock_name(stock_code):
-    """获取股票中文名称"""
-    try:
-        stock_info = ak.stock_individual_info_em(symbol=stock_code)
-        return stock_info.iloc[0]['value']
-    except:
-        return stock_code
+    """获取股票中文名称，查询结果在本地缓存，查询失败时返回股票代码"""
+    return stock_info.get_stock_name(stock_code) or stock_code
 
 def main():
+    # 设置控制台输出编码：无法编码的字符替换显示，不再逐行做GBK转码
+    sys.stdout.reconfigure(errors='replace')
+    
     # 设置股票代码和回测区间
     stock_code = '600570'
     stock_name = get_stock_name(stock_code)
     start_date = '2020-01-01'
     end_date = '2024-12-31'
+    initial_value = 100000.0  # 初始资金
     
-    print(f"\n=== 开始回测 {stock_code} {stock_name} ===".encode('gbk').decode('gbk'))
-    print(f"回测区间: {start_date} 至 {end_date}".encode('gbk').decode('gbk'))
+    # 回测后端：'vectorbt' 为整段数组的向量化回测，'backtrader' 为逐bar的事件驱动回测
+    backend = 'vectorbt'
+    
+    print(f"\n=== 开始回测 {stock_code} {stock_name} ===")
+    print(f"回测区间: {start_date} 至 {end_date}")
     
     # 创建输出目录
     output_dir = 'output'
@@ -41,49 +45,51 @@ def main():
     # 初始化数据加载器
     loader = DataLoader()
     
-    # 下载A股数据
-    data = loader.download_data(stock_code, start_date, end_date, market='A')
+    # 获取A股数据，已下载过的区间直接读取data目录下的parquet缓存
+    data = loader.get_or_download(stock_code, start_date, end_date, market='A', cache_dir=data_dir)
     
     if data is None:
         print("获取数据失败，请检查网络连接和股票代码是否正确")
         return
     
-    # 保存数据
-    loader.save_data(os.path.join(data_dir, f'{stock_code}.csv'))
-    
-    # 初始化回测引擎
-    engine = BacktestEngine(initial_cash=100000.0)
+    # 使用日线级别的MACD参数
+    strategy_params = {'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9}
     
-    # 添加数据和策略
-    engine.add_data(data, name=f'{stock_code} {stock_name}')
-    engine.add_strategy(MACDHistogramStrategy, 
-                       fastperiod=12,     # 使用日线级别的MACD参数
-                       slowperiod=26,
-                       signalperiod=9)
-    
-    # 运行回测
-    results = engine.run()
+    if backend == 'vectorbt':
+        # vectorbt导入较慢，只在使用向量化回测时导入
+        from strategies import macd_histogram_vbt
+        
+        # 向量化回测：指标与买卖信号一次性算出
+        portfolio = macd_histogram_vbt.run(data['Close'], data['High'], data['Low'], data['Volume'],
+                                           strategy_params, init_cash=initial_value)
+        stats = macd_histogram_vbt.performance_stats(portfolio)
+        engine_values = portfolio.value().values
+    else:
+        # 初始化回测引擎
+        engine = BacktestEngine(initial_cash=initial_value)
+        
+        # 添加数据和策略
+        engine.add_data(data, name=f'{stock_code} {stock_name}')
+        engine.add_strategy(MACDHistogramStrategy, verbose=True, **strategy_params)
+        
+        # 运行回测
+        results = engine.run()
+        
+        # 获取回测统计
+        stats = engine.get_performance_stats()
+        engine_values = engine.portfolio_values
     
-    # 获取回测统计
-    stats = engine.get_performance_stats()
-    print("\n=== 回测结果 ===".encode('gbk').decode('gbk'))
+    print("\n=== 回测结果 ===")
     for key, value in stats.items():
         if isinstance(value, float):
-            print(f"{key}: {value:.2f}".encode('gbk').decode('gbk'))
-        else:
-            print(f"{key}: {value}".encode('gbk').decode('gbk'))
-    
-    # 计算每日收益率
-    portfolio_values = []
-    for i in range(len(data)):
-        if i < len(engine.portfolio_values):
-            portfolio_values.append(engine.portfolio_values[i])
+            print(f"{key}: {value:.2f}")
         else:
-            portfolio_values.append(portfolio_values[-1] if portfolio_values else 100000.0)
+            print(f"{key}: {value}")
     
-    portfolio_values = pd.Series(portfolio_values, index=data.index)
-    portfolio_values = portfolio_values.ffill().bfill()
-    initial_value = 100000.0  # 初始资金
+    # 将组合价值对齐到行情日期，缺失的尾部沿用最后一个值
+    engine_values = np.asarray(engine_values, dtype=np.float64)
+    portfolio_values = pd.Series(engine_values, index=data.index[:len(engine_values)])
+    portfolio_values = portfolio_values.reindex(data.index).ffill().fillna(initial_value)
     
     # 打印投资组合价值序列
     print("\n=== 投资组合价值序列 ===")
@@ -94,9 +100,6 @@ def main():
     print(f"最终价值: {portfolio_values.iloc[-1]:.2f}")
     print(f"收益率: {(portfolio_values.iloc[-1]/initial_value - 1) * 100:.2f}%")
     
-    # 计算收益率序列
-    daily_returns = portfolio_values.pct_change().fillna(0) * 100  # 日收益率（百分比）
-    
     # 性能分析
     analyzer = PerformanceAnalyzer(portfolio_values, stock_code)
     metrics = analyzer.calculate_metrics()
@@ -0,0 +1,98 @@
+from utils.data_loader import DataLoader
+from strategies import macd_histogram_vbt
+import os
+import sys
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+
+def sweep(data, fast_periods, slow_periods, signal_periods, exit_loss_pcts=None, exit_profit_pcts=None,
+          params=None, init_cash=100000.0):
+    """
+    MACD参数网格搜索，所有参数组合沿列方向展开，一次向量化回测
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        DataLoader返回的行情数据
+    fast_periods, slow_periods, signal_periods : array-like
+        快线、慢线、信号线周期，取笛卡尔积
+    exit_loss_pcts, exit_profit_pcts : array-like, optional
+        止损、止盈比例，与MACD参数一起取笛卡尔积；默认使用params中的单个值
+    params : dict, optional
+        其余策略参数，同 macd_histogram_vbt.DEFAULT_PARAMS
+    init_cash : float, optional
+        初始资金
+
+    Returns:
+    --------
+    vectorbt.Portfolio
+        每一列对应一个参数组合
+    """
+    p = {**macd_histogram_vbt.DEFAULT_PARAMS, **(params or {})}
+    close = data['Close']
+
+    macd_ind = vbt.MACD.run(close, fast_periods, slow_periods, signal_periods,
+                            macd_ewm=True, signal_ewm=True, param_product=True,
+                            hide_params=['macd_ewm', 'signal_ewm'])
+    trend_ema = vbt.MA.run(close, p['trend_ema_period'], ewm=True).ma.values
+    vol_ma = vbt.MA.run(data['Volume'], p['volume_ma_period']).ma.values
+
+    # 与参数无关的序列取 (n, 1) 列向量，与 (n, 参数组合数) 的MACD广播
+    n = len(close)
+    entries, exits = macd_histogram_vbt.signals(
+        close.values[:, None], data['Volume'].values[:, None],
+        macd_ind.macd.values.reshape(n, -1), macd_ind.hist.values.reshape(n, -1),
+        trend_ema[:, None], vol_ma[:, None], p['macd_threshold'])
+
+    # 止损止盈组合作为外层列，MACD参数组合作为内层列，信号按止损止盈组合数平铺
+    stops = pd.MultiIndex.from_product(
+        [np.atleast_1d(p['exit_loss_pct'] if exit_loss_pcts is None else exit_loss_pcts),
+         np.atleast_1d(p['exit_profit_pct'] if exit_profit_pcts is None else exit_profit_pcts)],
+        names=['sl_stop', 'tp_stop'])
+    macd_columns = macd_ind.wrapper.columns
+    columns = pd.MultiIndex.from_tuples(
+        [stop + macd for stop in stops for macd in macd_columns],
+        names=stops.names + macd_columns.names)
+    repeat = len(macd_columns)
+
+    # sl_stop/tp_stop传入 (1, 列数) 的数组，由vectorbt按列广播，在numba内核中与信号一起处理
+    return vbt.Portfolio.from_signals(
+        close,
+        pd.DataFrame(np.tile(entries, len(stops)), index=close.index, columns=columns),
+        pd.DataFrame(np.tile(exits, len(stops)), index=close.index, columns=columns),
+        high=data['High'], low=data['Low'],
+        size=0.95, size_type='percent', size_granularity=1,
+        sl_stop=np.repeat(stops.get_level_values('sl_stop').to_numpy(), repeat)[None, :],
+        tp_stop=np.repeat(stops.get_level_values('tp_stop').to_numpy(), repeat)[None, :],
+        sl_trail=False,
+        init_cash=init_cash, freq='1D')
+
+
+def main():
+    # 设置控制台输出编码
+    sys.stdout.reconfigure(errors='replace')
+
+    stock_code = '600570'
+    start_date = '2020-01-01'
+    end_date = '2024-12-31'
+
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    data = DataLoader().get_or_download(stock_code, start_date, end_date, market='A', cache_dir=data_dir)
+    if data is None:
+        print("获取数据失败，请检查网络连接和股票代码是否正确")
+        return
+
+    portfolio = sweep(data, np.arange(8, 20), np.arange(20, 36), 9)
+
+    sharpe = portfolio.sharpe_ratio(year_freq='252 days')
+    total_return = portfolio.total_return() * 100
+    result = pd.DataFrame({'夏普比率': sharpe, '总收益率(%)': total_return})
+
+    print(f"\n=== MACD参数网格搜索 {stock_code}，共{len(result)}组参数 ===")
+    print(result.sort_values('夏普比率', ascending=False).head(10).round(4))
+
+
+if __name__ == "__main__":
+    main()
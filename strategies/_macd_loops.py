@@ -0,0 +1,65 @@
+"""
+MACDHistogramStrategy 所用指标的 numba 内核
+
+口径与 backtrader 的 bt.indicators.EMA/SMA/MACD 一致：EMA 以前 period 个有效值的
+简单平均作为初值，之后按 v += alpha * (x - v) 递推；预热期内为 NaN。
+"""
+import numpy as np
+
+from utils._njit import njit
+
+
+@njit(cache=True)
+def ema(values, period):
+    """指数移动平均，跳过开头的 NaN（用于在 MACD 线上计算信号线）"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+
+    start = 0
+    while start < n and np.isnan(values[start]):
+        start += 1
+    if start + period > n:
+        return out
+
+    v = 0.0
+    for i in range(start, start + period):
+        v += values[i]
+    v /= period
+    out[start + period - 1] = v
+
+    alpha = 2.0 / (period + 1)
+    for i in range(start + period, n):
+        v += alpha * (values[i] - v)
+        out[i] = v
+    return out
+
+
+@njit(cache=True)
+def sma(values, period):
+    """简单移动平均，窗口和逐日加减更新"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+
+    window_sum = 0.0
+    for i in range(n):
+        window_sum += values[i]
+        if i >= period:
+            window_sum -= values[i - period]
+        if i >= period - 1:
+            out[i] = window_sum / period
+    return out
+
+
+@njit(cache=True)
+def macd_hist(close, nf, ns, nsig):
+    """
+    计算 MACD
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (macd, signal, hist)，hist = macd - signal
+    """
+    macd = ema(close, nf) - ema(close, ns)
+    signal = ema(macd, nsig)
+    return macd, signal, macd - signal
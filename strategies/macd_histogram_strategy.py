@@ -1,6 +1,8 @@
 import backtrader as bt
 import numpy as np
 
+from strategies._macd_loops import macd_hist, ema, sma
+
 class MACDHistogramStrategy(bt.Strategy):
     params = (
         ('fastperiod', 12),
@@ -11,25 +13,15 @@ class MACDHistogramStrategy(bt.Strategy):
         ('trend_ema_period', 60),      # 趋势判断EMA周期
         ('volume_ma_period', 20),      # 成交量MA周期
         ('macd_threshold', 0.0),       # MACD柱状图阈值
+        ('verbose', False),            # 是否打印交易日志
     )
 
     def __init__(self):
-        # MACD指标
-        self.macd = bt.indicators.MACD(
-            self.data.close,
-            period_me1=self.p.fastperiod,
-            period_me2=self.p.slowperiod,
-            period_signal=self.p.signalperiod
-        )
-        
-        # MACD柱状图
-        self.macd_hist = self.macd.macd - self.macd.signal
+        self._compute()
         
-        # 趋势判断EMA
-        self.trend_ema = bt.indicators.EMA(self.data.close, period=self.p.trend_ema_period)
-        
-        # 成交量MA
-        self.volume_ma = bt.indicators.SMA(self.data.volume, period=self.p.volume_ma_period)
+        # 不再使用backtrader指标，需手动设置预热期，与指标全部有效的第一天对齐
+        self.addminperiod(max(self.p.slowperiod + self.p.signalperiod - 1,
+                              self.p.trend_ema_period, self.p.volume_ma_period))
         
         # 记录买入价格
         self.buy_price = None
@@ -38,6 +30,43 @@ class MACDHistogramStrategy(bt.Strategy):
         self.order = None
         self.last_operation = None
         
+    def _compute(self):
+        """
+        在整段数据上一次算出指标和买卖条件，next中按bar下标取值
+        
+        数据已预加载，data.close.array即完整的收盘价序列。指标由numba编译的
+        _macd_loops内核计算，EMA初值口径与backtrader一致。
+        """
+        close = np.asarray(self.data.close.array, dtype=np.float64)
+        volume = np.asarray(self.data.volume.array, dtype=np.float64)
+        self._close = close
+        
+        # MACD指标及柱状图
+        self._macd, self._signal, self._hist = macd_hist(
+            close, self.p.fastperiod, self.p.slowperiod, self.p.signalperiod)
+        
+        # 趋势判断EMA
+        self._trend_ema = ema(close, self.p.trend_ema_period)
+        
+        # 成交量MA
+        self._volume_ma = sma(volume, self.p.volume_ma_period)
+        
+        # 预先算出每个bar的买卖条件
+        thr = self.p.macd_threshold
+        hist = self._hist
+        # 前一个bar的柱状图，第一个bar记为0（np.roll会把末尾的值绕回开头）
+        prev_hist = np.empty_like(hist)
+        prev_hist[0] = 0
+        prev_hist[1:] = hist[:-1]
+        # 买入：MACD柱状图由负转正、价格在趋势线上方、成交量放大、MACD快线在零轴上方
+        self.buy_mask = ((prev_hist < thr) & (hist > thr) &
+                         (close > self._trend_ema) &
+                         (volume > self._volume_ma * 1.2) &
+                         (self._macd > 0))
+        # 卖出：MACD柱状图由正转负、价格跌破趋势线
+        self.sell_mask_cross = (prev_hist > -thr) & (hist < -thr)
+        self.below_trend = close < self._trend_ema
+        
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             return
@@ -45,8 +74,9 @@ class MACDHistogramStrategy(bt.Strategy):
         if order.status in [order.Completed]:
             if order.isbuy():
                 self.buy_price = order.executed.price
-                self.log(f'买入执行: 价格={order.executed.price:.2f}, 成本={order.executed.value:.2f}, 手续费={order.executed.comm:.2f}')
-            else:
+                if self.p.verbose:
+                    self.log(f'买入执行: 价格={order.executed.price:.2f}, 成本={order.executed.value:.2f}, 手续费={order.executed.comm:.2f}')
+            elif self.p.verbose:
                 self.log(f'卖出执行: 价格={order.executed.price:.2f}, 成本={order.executed.value:.2f}, 手续费={order.executed.comm:.2f}')
                 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
@@ -55,65 +85,56 @@ class MACDHistogramStrategy(bt.Strategy):
         self.order = None
         
     def notify_trade(self, trade):
-        if not trade.isclosed:
+        if not trade.isclosed or not self.p.verbose:
             return
             
         self.log(f'交易利润: 毛利润={trade.pnl:.2f}, 净利润={trade.pnlcomm:.2f}')
         
     def log(self, txt, dt=None):
+        # 调用处已按verbose判断，避免关闭日志时仍拼接字符串；这里再兜底一次
+        if not self.p.verbose:
+            return
         dt = dt or self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()}, {txt}'.encode('gbk').decode('gbk'))
+        print(f'{dt.isoformat()}, {txt}')
         
     def should_buy(self):
-        # 1. MACD柱状图由负转正
-        curr_hist = self.macd_hist[0]  # 当前柱状图
-        prev_hist = self.macd_hist[-1] if len(self.macd_hist) > 1 else 0  # 前一个柱状图
-        
-        macd_cross_up = prev_hist < self.p.macd_threshold and curr_hist > self.p.macd_threshold
-        
-        # 2. 价格在趋势线上方
-        price_above_trend = self.data.close[0] > self.trend_ema[0]
-        
-        # 3. 成交量放大
-        volume_increase = self.data.volume[0] > self.volume_ma[0] * 1.2
-        
-        # 4. MACD快线在零轴上方
-        macd_above_zero = self.macd.macd[0] > 0
-        
-        return (macd_cross_up and price_above_trend and volume_increase and macd_above_zero and
-                self.last_operation != 'buy')
+        i = len(self) - 1  # 当前bar在预计算数组中的下标
+        return self.buy_mask[i] and self.last_operation != 'buy'
                 
     def should_sell(self):
         if not self.position:
             return False
             
+        i = len(self) - 1
+        close = self._close[i]
+        
         # 1. 止盈
         if self.buy_price:
-            current_profit_pct = (self.data.close[0] - self.buy_price) / self.buy_price
+            current_profit_pct = (close - self.buy_price) / self.buy_price
             if current_profit_pct >= self.p.exit_profit_pct:
-                self.log(f'触发止盈: 当前收益率={current_profit_pct*100:.2f}%')
+                if self.p.verbose:
+                    self.log(f'触发止盈: 当前收益率={current_profit_pct*100:.2f}%')
                 return True
                 
         # 2. 止损
         if self.buy_price:
-            current_loss_pct = (self.buy_price - self.data.close[0]) / self.buy_price
+            current_loss_pct = (self.buy_price - close) / self.buy_price
             if current_loss_pct >= self.p.exit_loss_pct:
-                self.log(f'触发止损: 当前亏损率={current_loss_pct*100:.2f}%')
+                if self.p.verbose:
+                    self.log(f'触发止损: 当前亏损率={current_loss_pct*100:.2f}%')
                 return True
                 
         # 3. MACD柱状图由正转负
-        curr_hist = self.macd_hist[0]
-        prev_hist = self.macd_hist[-1] if len(self.macd_hist) > 1 else 0
-        
-        macd_cross_down = prev_hist > -self.p.macd_threshold and curr_hist < -self.p.macd_threshold
+        macd_cross_down = self.sell_mask_cross[i]
         
         # 4. 价格跌破趋势线
-        price_below_trend = self.data.close[0] < self.trend_ema[0]
+        price_below_trend = self.below_trend[i]
         
-        if macd_cross_down:
-            self.log('MACD柱状图死叉卖出信号')
-        elif price_below_trend:
-            self.log('价格跌破趋势线卖出信号')
+        if self.p.verbose:
+            if macd_cross_down:
+                self.log('MACD柱状图死叉卖出信号')
+            elif price_below_trend:
+                self.log('价格跌破趋势线卖出信号')
             
         return (macd_cross_down or price_below_trend) and self.last_operation != 'sell'
         
@@ -121,15 +142,18 @@ class MACDHistogramStrategy(bt.Strategy):
         if self.order:
             return
             
+        close = self._close[len(self) - 1]
         if not self.position:  # 没有持仓
             if self.should_buy():
-                size = int(self.broker.getcash() * 0.95 / self.data.close[0])  # 使用95%资金买入
+                size = int(self.broker.getcash() * 0.95 / close)  # 使用95%资金买入
                 self.order = self.buy(size=size)
                 self.last_operation = 'buy'
-                self.log(f'买入信号: MACD柱状图金叉, 价格={self.data.close[0]:.2f}')
+                if self.p.verbose:
+                    self.log(f'买入信号: MACD柱状图金叉, 价格={close:.2f}')
                 
         else:  # 有持仓
             if self.should_sell():
                 self.order = self.sell(size=self.position.size)
                 self.last_operation = 'sell'
-                self.log(f'卖出信号: 价格={self.data.close[0]:.2f}')
+                if self.p.verbose:
+                    self.log(f'卖出信号: 价格={close:.2f}')
@@ -0,0 +1,127 @@
+"""
+MACD柱状图策略的向量化回测（vectorbt）
+
+与 MACDHistogramStrategy 的信号规则相同，但指标和买卖信号都在整段行情数组上
+一次算出，止盈止损由 vectorbt 的 numba 内核处理，不再逐 bar 执行 Python 代码。
+"""
+import numpy as np
+import vectorbt as vbt
+
+# 与 MACDHistogramStrategy.params 保持一致
+DEFAULT_PARAMS = {
+    'fastperiod': 12,
+    'slowperiod': 26,
+    'signalperiod': 9,
+    'exit_profit_pct': 0.15,     # 止盈比例
+    'exit_loss_pct': 0.07,       # 止损比例
+    'trend_ema_period': 60,      # 趋势判断EMA周期
+    'volume_ma_period': 20,      # 成交量MA周期
+    'macd_threshold': 0.0,       # MACD柱状图阈值
+}
+
+
+def run(close, high, low, volume, params=None, init_cash=100000.0):
+    """
+    运行向量化回测
+
+    Parameters:
+    -----------
+    close, high, low, volume : pandas.Series
+        收盘价、最高价、最低价、成交量，索引为日期
+    params : dict, optional
+        策略参数，未给出的键使用 DEFAULT_PARAMS 中的默认值
+    init_cash : float, optional
+        初始资金
+
+    Returns:
+    --------
+    vectorbt.Portfolio
+        回测结果，信号当日按收盘价成交，每次买入使用95%的资金
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    thr = p['macd_threshold']
+
+    # 指标一次性计算
+    macd_ind = vbt.MACD.run(close, p['fastperiod'], p['slowperiod'], p['signalperiod'],
+                            macd_ewm=True, signal_ewm=True)
+    macd = macd_ind.macd.values
+    hist = macd_ind.hist.values
+    trend_ema = vbt.MA.run(close, p['trend_ema_period'], ewm=True).ma.values
+    vol_ma = vbt.MA.run(volume, p['volume_ma_period']).ma.values
+    close_values = np.asarray(close)
+    volume_values = np.asarray(volume)
+
+    entries, exits = signals(close_values, volume_values, macd, hist, trend_ema, vol_ma, thr)
+
+    return vbt.Portfolio.from_signals(
+        close, entries, exits,
+        high=high, low=low,
+        size=0.95, size_type='percent', size_granularity=1,
+        sl_stop=p['exit_loss_pct'], tp_stop=p['exit_profit_pct'], sl_trail=False,
+        init_cash=init_cash, freq='1D')
+
+
+def signals(close, volume, macd, hist, trend_ema, vol_ma, thr=0.0):
+    """
+    由指标数组生成买卖信号
+
+    所有数组的第0维为日期。参数组合沿第1维展开时（macd、hist 形状为 (n, k)），
+    其余数组传入 (n, 1) 的列向量即可按numpy规则广播。
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (entries, exits)
+    """
+    # 前一个bar的柱状图，第一个bar记为0（np.roll会把末尾的值绕回开头）
+    prev_hist = np.empty_like(hist)
+    prev_hist[0] = 0
+    prev_hist[1:] = hist[:-1]
+
+    # 买入：MACD柱状图由负转正、价格在趋势线上方、成交量放大、MACD快线在零轴上方
+    entries = ((prev_hist < thr) & (hist > thr) &
+               (close > trend_ema) &
+               (volume > 1.2 * vol_ma) &
+               (macd > 0))
+
+    # 卖出：MACD柱状图由正转负或价格跌破趋势线，止盈止损交给 sl_stop/tp_stop
+    exits = ((prev_hist > -thr) & (hist < -thr)) | (close < trend_ema)
+    return entries, exits
+
+
+def performance_stats(portfolio):
+    """
+    汇总回测统计，键与 BacktestEngine.get_performance_stats 一致
+
+    夏普比率按backtrader SharpeRatio分析器的默认口径计算：以自然年收益率
+    （首年相对初始资金）减去1%的无风险收益率，除以其总体标准差，不做年化。
+    """
+    init_cash = float(portfolio.init_cash)
+    final_value = float(portfolio.final_value())
+    total_return = final_value / init_cash - 1
+    days = len(portfolio.wrapper.index)
+    annual_return = (1 + total_return) ** (252 / days) - 1 if days > 0 else 0
+
+    closed_trades = portfolio.trades.closed
+    total_trades = int(closed_trades.count())
+    won_trades = int(closed_trades.winning.count())
+    sharpe_ratio = _yearly_sharpe(portfolio.value(), init_cash)
+
+    return {
+        '初始资金': init_cash,
+        '最终市值': final_value,
+        '总收益率': total_return * 100,
+        '年化收益率': annual_return * 100,
+        '最大回撤': -float(portfolio.max_drawdown()) * 100,
+        '夏普比率': sharpe_ratio,
+        '总交易次数': total_trades,
+        '胜率': won_trades / total_trades * 100 if total_trades > 0 else 0
+    }
+
+
+def _yearly_sharpe(values, init_cash, riskfree_rate=0.01):
+    """按自然年收益率计算夏普比率（与backtrader的SharpeRatio默认参数一致），无法计算时为0"""
+    year_end = values.groupby(values.index.year).last().to_numpy(dtype=np.float64)
+    excess = year_end / np.concatenate([[init_cash], year_end[:-1]]) - 1 - riskfree_rate
+    std = excess.std()
+    return float(excess.mean() / std) if std > 0 else 0
@@ -0,0 +1,20 @@
+"""
+numba 的可选导入
+
+未安装 numba 时，njit 退化为不做任何处理的装饰器，prange 退化为 range，
+被装饰的函数按普通 Python 函数执行，结果一致，只是速度较慢。
+"""
+
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        # 兼容 @njit 与 @njit(cache=True) 两种写法
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
@@ -1,8 +1,21 @@
 import yfinance as yf
-import akshare as ak
 import pandas as pd
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+# 回测信号对价格的末几位小数不敏感，开高低收与成交量用float32即可，内存减半
+FLOAT32_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def optimize_dtypes(df):
+    """将存在的开高低收、成交量列转换为float32"""
+    columns = [col for col in FLOAT32_COLUMNS if col in df.columns]
+    df[columns] = df[columns].astype(np.float32)
+    return df
+
+
 class DataLoader:
     def __init__(self):
         self.data = None
@@ -32,51 +45,134 @@ class DataLoader:
         if end_date is None:
             end_date = datetime.now().strftime('%Y-%m-%d')
             
+        df = self._download_one(symbol, start_date, end_date, interval, market)
+        if df is None:
+            return None
+        self.data = df
+        return self.data
+    
+    def _download_one(self, symbol, start_date, end_date, interval='1d', market='US'):
+        """下载单只股票的数据，不修改self.data，可在多个线程中同时调用"""
         if market == 'A':
             # 处理A股数据
             try:
-                # 获取A股日线数据
+                # 获取A股日线数据；akshare导入较慢，命中本地缓存时不需要导入
+                import akshare as ak
                 df = ak.stock_zh_a_hist(symbol=symbol, start_date=start_date.replace('-', ''), 
                                       end_date=end_date.replace('-', ''), adjust="qfq")
                 
-                # 重命名列以匹配backtrader要求的格式
-                df = df.rename(columns={
-                    '日期': 'Date',
-                    '开盘': 'Open',
-                    '最高': 'High',
-                    '最低': 'Low',
-                    '收盘': 'Close',
-                    '成交量': 'Volume',
-                    '成交额': 'Amount'
-                })
-                
-                # 设置日期索引
-                df['Date'] = pd.to_datetime(df['Date'])
-                df.set_index('Date', inplace=True)
+                # 直接用原始列构建backtrader要求格式的DataFrame，不再逐步rename/set_index
+                index = pd.DatetimeIndex(pd.to_datetime(df['日期'].to_numpy()), name='Date')
+                df = pd.DataFrame({
+                    'Open': df['开盘'].to_numpy(np.float64),
+                    'High': df['最高'].to_numpy(np.float64),
+                    'Low': df['最低'].to_numpy(np.float64),
+                    'Close': df['收盘'].to_numpy(np.float64),
+                    'Volume': df['成交量'].to_numpy(np.float64),
+                    'Amount': df['成交额'].to_numpy(np.float64),
+                }, index=index)
                 
-                self.data = df
+                return optimize_dtypes(df)
                 
             except Exception as e:
                 print(f"获取A股数据失败: {str(e)}")
                 return None
                 
-        else:
-            # 处理美股数据
-            ticker = yf.Ticker(symbol)
-            self.data = ticker.history(start=start_date, end=end_date, interval=interval)
+        # 处理美股数据
+        ticker = yf.Ticker(symbol)
+        return optimize_dtypes(ticker.history(start=start_date, end=end_date, interval=interval))
+    
+    def _load_or_download(self, symbol, start_date, end_date, market, cache_dir):
+        """读取parquet缓存，缓存不存在时下载并写入缓存；不修改self.data"""
+        filename = f"{symbol}_{start_date.replace('-', '')}_{end_date.replace('-', '')}.parquet"
+        filepath = os.path.join(cache_dir, filename)
+        if os.path.exists(filepath):
+            return pd.read_parquet(filepath, engine='pyarrow')
             
-        return self.data
+        df = self._download_one(symbol, start_date, end_date, market=market)
+        if df is not None:
+            # 缓存写入失败不影响本次返回的数据
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                df.to_parquet(filepath, engine='pyarrow', compression='snappy')
+            except Exception as e:
+                print(f"写入数据缓存时出错: {e}")
+        return df
+    
+    def get_or_download(self, symbol, start_date, end_date=None, market='A', cache_dir='data'):
+        """
+        获取历史数据，优先读取本地parquet缓存，缓存不存在时下载并写入缓存
+        
+        Parameters:
+        -----------
+        symbol, start_date, end_date, market :
+            同 download_data
+        cache_dir : str, optional
+            缓存目录，文件名由股票代码和起止日期组成
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            历史数据，下载失败时返回None
+        """
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            
+        df = self._load_or_download(symbol, start_date, end_date, market, cache_dir)
+        if df is not None:
+            self.data = df
+        return df
+    
+    def download_many(self, symbols, start_date, end_date=None, market='A', workers=16, cache_dir='data'):
+        """
+        多线程批量获取多只股票的历史数据，已缓存的股票直接读取本地parquet
+        
+        Parameters:
+        -----------
+        symbols : list of str
+            股票代码列表
+        start_date, end_date, market, cache_dir :
+            同 get_or_download
+        workers : int, optional
+            下载线程数，瓶颈在网络延迟，线程数可以远大于CPU核数
+            
+        Returns:
+        --------
+        dict
+            {股票代码: pandas.DataFrame}，下载失败的股票对应None
+        """
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            
+        out = {}
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futs = {ex.submit(self._load_or_download, s, start_date, end_date, market, cache_dir): s
+                    for s in symbols}
+            for f in as_completed(futs):
+                # 单只股票出错只影响该股票，不中断整个批次
+                try:
+                    out[futs[f]] = f.result()
+                except Exception as e:
+                    print(f"获取{futs[f]}数据失败: {str(e)}")
+                    out[futs[f]] = None
+        return out
     
     def save_data(self, filepath):
         """
-        保存数据到CSV文件
+        保存数据到文件，.csv后缀保存为CSV，其余保存为parquet（snappy压缩）
         """
         if self.data is not None:
-            self.data.to_csv(filepath)
+            if filepath.endswith('.csv'):
+                self.data.to_csv(filepath)
+            else:
+                self.data.to_parquet(filepath, engine='pyarrow', compression='snappy')
             
     def load_data(self, filepath):
         """
-        从CSV文件加载数据
+        从文件加载数据，按后缀区分CSV与parquet
         """
-        self.data = pd.read_csv(filepath, index_col=0, parse_dates=True)
+        if filepath.endswith('.csv'):
+            self.data = pd.read_csv(filepath, index_col=0, parse_dates=True)
+        else:
+            self.data = pd.read_parquet(filepath, engine='pyarrow')
         return self.data
@@ -0,0 +1,93 @@
+"""
+股票基础信息查询
+
+股票名称查询成功后写入本地 JSON 缓存，后续运行直接读取，不再访问网络。
+"""
+import functools
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# 股票名称缓存文件: {股票代码: 中文名称}
+NAME_CACHE_PATH = Path('~/.cache/quant/names.json').expanduser()
+
+
+def _load_name_cache():
+    try:
+        with open(NAME_CACHE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_name_cache = _load_name_cache()
+
+
+def _save_name_cache():
+    """先写临时文件再替换，进程中断或多个进程同时写入时不会留下损坏的缓存文件"""
+    try:
+        NAME_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=NAME_CACHE_PATH.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(_name_cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, NAME_CACHE_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"写入股票名称缓存时出错: {e}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _fetch_stock_name(stock_code):
+    """通过网络查询股票名称，失败返回None（同一进程内不重复查询）"""
+    # 优先使用akshare的单只股票接口；akshare导入较慢，只在需要联网查询时导入
+    try:
+        import akshare as ak
+        stock_info = ak.stock_individual_info_em(symbol=stock_code)
+        name_row = stock_info[stock_info['item'].str.contains('名称|简称', na=False)]
+        if not name_row.empty:
+            return name_row.iloc[0]['value']
+    except Exception as e:
+        print(f"使用akshare获取股票信息时出错: {e}")
+
+    # 配置了tushare token时再尝试tushare
+    token = os.getenv('TUSHARE_TOKEN')
+    if token:
+        try:
+            import tushare as ts
+            pro = ts.pro_api(token)
+            df = pro.stock_basic(exchange='', list_status='L', fields='symbol,name')
+            stock_info = df[df['symbol'] == stock_code]
+            if not stock_info.empty:
+                return stock_info.iloc[0]['name']
+        except Exception as e:
+            print(f"使用tushare获取股票信息时出错: {e}")
+
+    return None
+
+
+def get_stock_name(stock_code):
+    """
+    获取股票中文名称
+
+    Parameters:
+    -----------
+    stock_code : str
+        股票代码，如'600570'
+
+    Returns:
+    --------
+    str or None
+        股票中文名称，查询失败时返回None
+    """
+    if stock_code in _name_cache:
+        return _name_cache[stock_code]
+
+    name = _fetch_stock_name(stock_code)
+    if name:
+        _name_cache[stock_code] = name
+        _save_name_cache()
+    return name